@@ -3,6 +3,7 @@
 """
 Gestor de base de datos (Ligas, Equipos, Jugadores) con menú interactivo.
 - Fuente de verdad: CSV en data/ligas.csv, data/equipos.csv, data/jugadores.csv
+- Caché binaria de lectura en data/.snapshot.bin (se regenera sola cuando cambian los CSV)
 - Exporta JSON para la web: data/ligas.json, data/equipos.json, data/jugadores.json
 - Genera páginas estáticas por jugador: players/<slug>.html (build)
 - Slugs únicos por entidad (URLs tipo ?slug= o players/<slug>.html)
@@ -14,23 +15,43 @@ Gestor de base de datos (Ligas, Equipos, Jugadores) con menú interactivo.
 - Borrados:
   - Liga: no se borran equipos; se “desasigna” (league_id vacío)
   - Equipo: bloqueado si tiene jugadores
-- Backups automáticos en backups/
+- Backups automáticos en backups/ (solo de los CSV que cambiaron)
 
 Uso rápido:
   python manage_db.py            # menú interactivo
-  python manage_db.py export     # exporta JSON
-  python manage_db.py build      # genera páginas estáticas de jugadores
+  python manage_db.py export     # exporta JSON (usa orjson si está instalado)
+  python manage_db.py export --compact  # JSON sin indentar
+  python manage_db.py build      # genera páginas estáticas de jugadores (solo las que cambiaron)
+  python manage_db.py build --force  # regenera todas las páginas
+  python manage_db.py import --entity players nuevos.csv  # alta masiva sin prompts
+  python manage_db.py batch --ops ops.json  # varias altas/ediciones/bajas en una sola pasada
+  python manage_db.py --no-cache # menú sin caché (relee los CSV en cada acción)
 """
 import csv
 import argparse
+import bisect
+import functools
+import hashlib
+import heapq
+import io
+import os
 import sys
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
 import json
+import marshal
 from pathlib import Path
 import shutil
+import string
 import re
 import unicodedata
 
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json de la stdlib
+    orjson = None
+
 DATA_DIR = Path('data')
 BACKUP_DIR = Path('backups')
 PLAYERS_DIR = Path('players')
@@ -43,6 +64,18 @@ PLAYERS_CSV = DATA_DIR / 'jugadores.csv'
 LEAGUES_JSON = DATA_DIR / 'ligas.json'
 TEAMS_JSON = DATA_DIR / 'equipos.json'
 PLAYERS_JSON = DATA_DIR / 'jugadores.json'
+BUILD_CACHE_JSON = DATA_DIR / '.build_cache.json'
+SNAPSHOT_BIN = DATA_DIR / '.snapshot.bin'
+SNAPSHOT_VERSION = 2  # subir si cambia la forma de las filas normalizadas
+BACKUP_INDEX_JSON = BACKUP_DIR / '.index.json'
+
+LEAGUE_HEADERS = ['id','name','country','logo','slug']
+TEAM_HEADERS = ['id','name','league_id','logo','slug']
+PLAYER_HEADERS = ['id','first_name','last_name','birth_date','team_id','country','photo','position','rating','sofifa_url','face_video_url','slug']
+PLAYER_STR_FIELDS = [k for k in PLAYER_HEADERS if k != 'rating']
+# Archivo y columnas de cada tabla, por la clave que usan la caché y los guardados
+TABLES = {'leagues': (LEAGUES_CSV, LEAGUE_HEADERS), 'teams': (TEAMS_CSV, TEAM_HEADERS),
+          'players': (PLAYERS_CSV, PLAYER_HEADERS)}
 
 ALLOWED_POSITIONS = ['Arquero','Defensor','Mediocampista','Delantero']
 
@@ -52,162 +85,414 @@ def ensure_dirs():
     PLAYERS_DIR.mkdir(exist_ok=True)
     TEMPLATES_DIR.mkdir(exist_ok=True)
 
+def file_digest(path):
+    return hashlib.blake2b(path.read_bytes()).hexdigest()
+
+def backup_copy(src, ts):
+    """Copia src a backups/<nombre>_<ts>[_N].csv y devuelve la ruta. El nombre se reserva
+    con 'xb' (falla si ya existe), así un backup nunca pisa a otro aunque ts se repita."""
+    n = 0
+    while True:
+        dst = BACKUP_DIR / f"{src.stem}_{ts}{f'_{n}' if n else ''}{src.suffix}"
+        try:
+            dst.open('xb').close()
+        except FileExistsError:
+            n += 1; continue
+        shutil.copyfile(src, dst)
+        return dst
+
 def backup_all():
+    """Copia los CSV a backups/, salteando los que no cambiaron desde su último backup.
+    backups/.index.json guarda mtime/tamaño (chequeo barato) y hash del contenido; el hash
+    solo se calcula cuando el tamaño no alcanza para saber si el archivo cambió."""
     ensure_dirs()
-    ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    # Sufijo con time_ns para que los nombres casi nunca se repitan; backup_copy() cubre el resto
+    ts = f"{datetime.utcnow():%Y%m%d_%H%M%S}_{time.time_ns() & 0xFFFF:04x}"
+    try:
+        index = json.loads(BACKUP_INDEX_JSON.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        index = {}
     paths = [LEAGUES_CSV, TEAMS_CSV, PLAYERS_CSV]
     made = []
+    dirty = False
     for p in paths:
         if p.exists():
-            dst = BACKUP_DIR / f"{p.stem}_{ts}{p.suffix}"
-            shutil.copy2(p, dst)
-            made.append(dst)
+            st = p.stat()
+            last = index.get(p.name) or {}
+            has_backup = (BACKUP_DIR / last.get('backup', '')).is_file()
+            if has_backup and last.get('mtime_ns') == st.st_mtime_ns and last.get('size') == st.st_size:
+                continue
+            # Si el tamaño difiere seguro cambió: se copia sin hashear (el hash queda pendiente)
+            digest = None
+            if has_backup and last.get('size') == st.st_size:
+                digest = file_digest(p)
+                last_hash = last.get('hash') or file_digest(BACKUP_DIR / last['backup'])
+            entry = {'hash': digest, 'backup': last.get('backup', ''), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+            dirty = True
+            if digest is None or last_hash != digest:
+                dst = backup_copy(p, ts)
+                entry['backup'] = dst.name
+                made.append(dst)
+            index[p.name] = entry
+    if dirty:
+        BACKUP_INDEX_JSON.write_text(json.dumps(index, indent=2), encoding='utf-8')
     return made
 
 def read_csv(path):
     if not path.exists(): return []
     with path.open(newline='', encoding='utf-8') as f:
-        r = csv.DictReader(f)
-        return [dict(row) for row in r]
+        text = f.read()
+    if '"' in text:
+        # csv.reader (tokenizador en C) + zip: evita el overhead de DictReader por fila
+        rows = (row for row in csv.reader(io.StringIO(text, newline='')) if row)
+    else:
+        # Sin comillas no hay comas ni saltos de línea dentro de un campo: str.split en bloque
+        rows = (line.split(',') for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n') if line)
+    headers = next(rows, None)
+    if not headers: return []
+    return [dict(zip(headers, row)) for row in rows]
 
 def write_csv(path, rows, headers):
-    with path.open('w', newline='', encoding='utf-8') as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        for r in rows:
-            w.writerow({k: r.get(k,'') for k in headers})
+    # El CSV completo se arma en memoria y sale al disco en una sola escritura
+    buf = io.StringIO(newline='')
+    w = csv.writer(buf)
+    w.writerow(headers)
+    w.writerows([r.get(k,'') for k in headers] for r in rows)
+    # Archivo temporal + os.replace: nunca queda un CSV a medio escribir
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        with tmp.open('w', newline='', encoding='utf-8') as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+def append_csv(path, rows, headers):
+    """Agrega filas al final del CSV sin reescribir lo existente. Devuelve False (sin tocar
+    el archivo) si no existe, está vacío o su encabezado no coincide: ahí va write_csv()."""
+    if not path.exists() or path.stat().st_size == 0: return False
+    with path.open('rb') as f:
+        first = f.readline().decode('utf-8').rstrip('\r\n')
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) not in (b'\n', b'\r')
+    if next(csv.reader([first]), []) != headers: return False
+    with path.open('a', newline='', encoding='utf-8') as f:
+        if needs_newline: f.write('\r\n')
+        csv.writer(f).writerows([r.get(k,'') for k in headers] for r in rows)
+    return True
 
-def next_id(rows):
+def next_id(rows, key=None):
+    # Con key se usa el máximo que mantiene get_index(), pero solo si rows coincide con la
+    # caché (mismo largo y misma última fila, p. ej. su copia); si no, se recorre rows
+    cached = _STATE[key] if key is not None else None
+    if cached is not None and len(rows) == len(cached) and (not rows or rows[-1]['id'] == cached[-1]['id']):
+        return str(get_index()['max_id'][key] + 1)
     ids = [int(r['id']) for r in rows if str(r.get('id','')).isdigit()]
     return str(max(ids)+1 if ids else 1)
 
+def strip_accents(s: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
+
+# Tabla precalculada para quitar acentos latinos (U+00C0..U+024F) con str.translate;
+# strip_accents() queda solo para caracteres fuera de ese rango
+_ACCENT_TABLE = {}
+for _cp in range(0xC0, 0x250):
+    _folded = strip_accents(chr(_cp))
+    if _folded != chr(_cp):
+        _ACCENT_TABLE[_cp] = _folded
+del _cp, _folded
+
+def fold_accents(s: str) -> str:
+    s = s.translate(_ACCENT_TABLE)
+    return s if s.isascii() else strip_accents(s)
+
+_SLUG_STRIP = re.compile(r'[^a-z0-9\s-]+')
+_SLUG_DASH = re.compile(r'[\s-]+')
+
 def slugify(s: str) -> str:
-    s = (s or '').strip().lower()
-    s = unicodedata.normalize('NFD', s)
-    s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
-    s = re.sub(r'[^a-z0-9\s-]', '', s)
-    s = re.sub(r'\s+', '-', s).strip('-')
-    s = re.sub(r'-+', '-', s)
-    return s
+    s = fold_accents((s or '').strip().lower())
+    s = _SLUG_STRIP.sub('', s)
+    return _SLUG_DASH.sub('-', s).strip('-')
 
 def unique_slug(base, existing_slugs):
     s = slugify(base)
     if s == '': s = 'item'
     if s not in existing_slugs: return s
+    prefix = s + '-'
     i = 2
-    while f"{s}-{i}" in existing_slugs:
+    while prefix + str(i) in existing_slugs:
         i += 1
-    return f"{s}-{i}"
+    return prefix + str(i)
 
-def valid_date(s):
+# El regex descarta rápido lo que no es YYYY-MM-DD (fromisoformat acepta también otras
+# formas ISO, como 20240101); el resto lo valida date.fromisoformat en C
+_DATE_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+def parse_date(s):
+    """date si s es una fecha YYYY-MM-DD válida; None si no."""
+    if not _DATE_RE.fullmatch(s or ''): return None
     try:
-        datetime.strptime(s, '%Y-%m-%d')
-        return True
-    except Exception:
-        return False
+        return date.fromisoformat(s)
+    except ValueError:
+        return None
+
+def valid_date(s):
+    return parse_date(s) is not None
+
+_FILE_STRIP = re.compile(r'[^a-z0-9\s_-]+')
+_FILE_UNDERSCORE = re.compile(r'[\s_]+')
 
 def country_to_file(country: str) -> str:
     if not country: return 'unknown'
-    s = unicodedata.normalize('NFD', country)
-    s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
-    s = s.lower().strip()
-    s = re.sub(r'[^a-z0-9\s_-]', '', s)
-    s = re.sub(r'\s+', '_', s)
-    s = re.sub(r'_+', '_', s)
+    s = fold_accents(country).lower().strip()
+    s = _FILE_STRIP.sub('', s)
+    s = _FILE_UNDERSCORE.sub('_', s)
     return s or 'unknown'
 
-def load_all():
+# Caché en memoria de load_all(); se invalida si cambia el mtime o el tamaño de algún CSV
+# (el tamaño cubre ediciones externas dentro de la resolución del mtime)
+_STATE = {'enabled': True, 'leagues': None, 'teams': None, 'players': None, 'stamp': None, 'index': None}
+
+def csv_stamp(path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def csv_stamps():
+    return {'leagues': csv_stamp(LEAGUES_CSV), 'teams': csv_stamp(TEAMS_CSV), 'players': csv_stamp(PLAYERS_CSV)}
+
+def load_all(copy=()):
+    """Devuelve (leagues, teams, players) desde la caché si los CSV no cambiaron.
+    copy: tabla ('leagues', 'teams', 'players') o tupla de tablas que el llamador va a
+    modificar antes de guardar; solo esas se devuelven copiadas."""
+    stamps = csv_stamps()
+    if not _STATE['enabled'] or _STATE['leagues'] is None or _STATE['stamp'] != stamps:
+        _STATE['leagues'], _STATE['teams'], _STATE['players'] = read_all_snapshot(stamps) if _STATE['enabled'] else read_all()
+        _STATE['stamp'] = stamps
+        _STATE['index'] = None
+    if isinstance(copy, str): copy = (copy,)
+    return tuple([dict(x) for x in _STATE[k]] if k in copy else _STATE[k] for k in ('leagues', 'teams', 'players'))
+
+def get_index():
+    """Índices sobre las filas del último load_all(): filas por id, posición por id, id máximo
+    e ids de hijos por padre. No relee los CSV (ni siquiera con --no-cache): se arman una
+    vez y se descartan cuando load_all() recarga o se guarda."""
+    if _STATE['leagues'] is None: load_all()
+    leagues, teams, players = _STATE['leagues'], _STATE['teams'], _STATE['players']
+    if _STATE['index'] is None:
+        keys = ('leagues', 'teams', 'players')
+        index = {
+            'by_id': {k: {} for k in keys},
+            'children': {'league_teams': {}, 'team_players': {}},
+            'pos': {k: {} for k in keys},
+            'max_id': {k: 0 for k in keys},
+            'search': {},
+        }
+        for key, rows in zip(keys, (leagues, teams, players)):
+            index_rows(index, key, rows, 0)
+        _STATE['index'] = index
+    return _STATE['index']
+
+def index_rows(index, key, rows, start):
+    """Suma al índice las filas de key que ocupan las posiciones start.. de la caché.
+    Lo usa get_index() al armarlo y cache_saved() tras anexar filas (sin rearmar todo)."""
+    by_id, pos = index['by_id'][key], index['pos'][key]
+    children = {'teams': ('league_teams', 'league_id'), 'players': ('team_players', 'team_id')}.get(key)
+    top = index['max_id'][key]
+    for i, r in enumerate(rows, start):
+        rid = r['id']
+        by_id[rid] = r
+        pos.setdefault(rid, i)
+        if rid.isdigit() and int(rid) > top: top = int(rid)
+        if children:
+            index['children'][children[0]].setdefault(r[children[1]], []).append(rid)
+    index['max_id'][key] = top
+    index['search'].pop(key, None)
+
+def find_row(key, rows, rid):
+    """Fila con ese id en rows (la lista de load_all() o su copia: mismo orden).
+    Usa la posición indexada y solo recorre la lista si no coincide."""
+    i = get_index()['pos'][key].get(rid)
+    if i is not None and i < len(rows) and rows[i]['id'] == rid:
+        return rows[i]
+    return next((x for x in rows if x['id']==rid), None)
+
+SEARCH_SEP = '\x1f'
+
+def search_rows(key, rows, q):
+    """Filas de rows (la lista de load_all() o su copia: mismo orden) cuyo '_search' contiene q.
+    Las claves de la entidad se unen en un solo string y se recorre con str.find; bisect
+    sobre los inicios de cada clave traduce la posición del hallazgo a la fila."""
+    if not q: return rows
+    search = get_index()['search']
+    if key not in search:
+        keys = [r['_search'].replace(SEARCH_SEP, ' ') for r in _STATE[key]]
+        starts, pos = [], 0
+        for k in keys:
+            starts.append(pos)
+            pos += len(k) + 1
+        search[key] = (SEARCH_SEP.join(keys), starts)
+    blob, starts = search[key]
+    if SEARCH_SEP in q or len(starts) != len(rows):
+        return [r for r in rows if q in r['_search']]
+    hits, i = [], blob.find(q)
+    while i >= 0:
+        n = bisect.bisect_right(starts, i) - 1
+        hits.append(rows[n])
+        i = blob.find(q, starts[n+1]) if n+1 < len(starts) else -1
+    return hits
+
+def read_all_snapshot(stamps=None):
+    """Como read_all(), pero reutiliza data/.snapshot.bin (filas ya normalizadas, en marshal)
+    mientras los CSV no cambien. Los CSV siguen siendo la fuente de verdad.
+    stamps: resultado de csv_stamps() si el llamador ya lo tiene (evita repetir los stat)."""
+    sig = csv_stamps() if stamps is None else stamps
+    try:
+        version, saved_sig, rows = marshal.loads(SNAPSHOT_BIN.read_bytes())
+        if version == SNAPSHOT_VERSION and saved_sig == sig:
+            return rows
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    rows = read_all()
+    try:
+        SNAPSHOT_BIN.write_bytes(marshal.dumps((SNAPSHOT_VERSION, sig, rows)))
+    except OSError:
+        pass
+    return rows
+
+def strip_fields(rows, fields):
+    for r in rows:
+        for k in fields:
+            r[k] = (r.get(k) or '').strip()
+
+def read_all():
     leagues = read_csv(LEAGUES_CSV)
     teams = read_csv(TEAMS_CSV)
     players = read_csv(PLAYERS_CSV)
-    # Normalizar
-    for l in leagues:
-        l['id'] = str(l.get('id','')).strip()
-        l['name'] = l.get('name','').strip()
-        l['country'] = l.get('country','').strip()
-        l['logo'] = l.get('logo','').strip()
-        l['slug'] = l.get('slug','').strip()
-    for t in teams:
-        t['id'] = str(t.get('id','')).strip()
-        t['name'] = t.get('name','').strip()
-        t['league_id'] = str(t.get('league_id','')).strip()
-        t['logo'] = t.get('logo','').strip()
-        t['slug'] = t.get('slug','').strip()
+    # Normalizar: todos los campos son texto sin espacios extremos, salvo rating (int)
+    strip_fields(leagues, LEAGUE_HEADERS)
+    strip_fields(teams, TEAM_HEADERS)
+    strip_fields(players, PLAYER_STR_FIELDS)
     for p in players:
-        p['id'] = str(p.get('id','')).strip()
-        p['first_name'] = p.get('first_name','').strip()
-        p['last_name'] = p.get('last_name','').strip()
-        p['birth_date'] = p.get('birth_date','').strip()
-        p['team_id'] = str(p.get('team_id','')).strip()
-        p['country'] = p.get('country','').strip()
-        p['photo'] = p.get('photo','').strip()
-        p['position'] = p.get('position','').strip()
-        try:
-            p['rating'] = int(p.get('rating', '') or 0)
-        except:
-            p['rating'] = 0
-        p['sofifa_url'] = p.get('sofifa_url','').strip()
-        p['face_video_url'] = p.get('face_video_url','').strip()
-        p['slug'] = p.get('slug','').strip()
+        v = (p.get('rating') or '').strip()
+        if v.isdecimal():
+            p['rating'] = int(v)
+        else:
+            try:
+                p['rating'] = int(v or 0)
+            except ValueError:
+                p['rating'] = 0
+    add_search_keys('leagues', leagues)
+    add_search_keys('teams', teams)
+    add_search_keys('players', players)
     return leagues, teams, players
 
-def save_all(leagues, teams, players):
-    write_csv(LEAGUES_CSV, leagues, ['id','name','country','logo','slug'])
-    write_csv(TEAMS_CSV, teams, ['id','name','league_id','logo','slug'])
-    write_csv(PLAYERS_CSV, players, ['id','first_name','last_name','birth_date','team_id','country','photo','position','rating','sofifa_url','face_video_url','slug'])
+# Texto de búsqueda en minúsculas por fila, precalculado (no se exporta ni se guarda en CSV)
+SEARCH_KEYS = {
+    'leagues': lambda l: f"{l['name']} {l['country']}".lower(),
+    'teams': lambda t: t['name'].lower(),
+    'players': lambda p: f"{p['first_name']} {p['last_name']}".lower(),
+}
 
-def validate(leagues, teams, players, verbose=True):
-    ok = True
+def add_search_keys(key, rows):
+    make = SEARCH_KEYS[key]
+    for r in rows:
+        r['_search'] = make(r)
+
+def cache_saved(key, rows, appended=None):
+    # Tras escribir un CSV, la caché pasa a ser lo recién guardado (si ya estaba cargada):
+    # solo las columnas escritas, igual que si otro proceso leyera el archivo.
+    # appended: filas anexadas al final; la caché y el índice se extienden sin rearmarse
+    if _STATE['stamp'] is None: return
+    path, headers = TABLES[key]
+    cached = _STATE[key]
+    if appended and cached is not None and len(cached) + len(appended) == len(rows):
+        new = [{k: r.get(k,'') for k in headers} for r in appended]
+        add_search_keys(key, new)
+        if _STATE['index'] is not None:
+            index_rows(_STATE['index'], key, new, len(cached))
+        cached.extend(new)
+    else:
+        rows = [{k: r.get(k,'') for k in headers} for r in rows]
+        add_search_keys(key, rows)
+        _STATE[key] = rows
+        _STATE['index'] = None
+    _STATE['stamp'][key] = csv_stamp(path)
+
+def save_table(key, rows, added=None):
+    """Guarda la tabla key ('leagues', 'teams', 'players') y actualiza la caché.
+    added: filas agregadas al final de rows; si el CSV lo permite, se anexan en vez de
+    reescribirlo."""
+    path, headers = TABLES[key]
+    appended = bool(added) and append_csv(path, added, headers)
+    if not appended:
+        write_csv(path, rows, headers)
+    cache_saved(key, rows, added if appended else None)
+
+def iter_problems(leagues, teams, players):
+    """Genera los mensajes de problemas a medida que los encuentra (no arma listas)."""
     league_ids = {l['id'] for l in leagues}
     team_ids = {t['id'] for t in teams}
     # Slugs únicos
     if len({l['slug'] for l in leagues if l['slug']}) != len(leagues):
-        ok = False; 
-        if verbose: print("Ligas: slugs duplicados")
+        yield "Ligas: slugs duplicados"
     if len({t['slug'] for t in teams if t['slug']}) != len(teams):
-        ok = False; 
-        if verbose: print("Equipos: slugs duplicados")
+        yield "Equipos: slugs duplicados"
     if len({p['slug'] for p in players if p['slug']}) != len(players):
-        ok = False; 
-        if verbose: print("Jugadores: slugs duplicados")
-    # Referencias y campos
-    for t in teams:
-        if t['league_id'] and t['league_id'] not in league_ids:
-            ok = False
-            if verbose: print(f"Equipo {t['name']} con league_id inexistente: {t['league_id']}")
+        yield "Jugadores: slugs duplicados"
+    # Referencias: diferencia de conjuntos; solo se recorre si hay ids inexistentes
+    if {t['league_id'] for t in teams} - league_ids - {''}:
+        for t in teams:
+            if t['league_id'] and t['league_id'] not in league_ids:
+                yield f"Equipo {t['name']} con league_id inexistente: {t['league_id']}"
+    bad_team_ids = {p['team_id'] for p in players} - team_ids - {''}
+    positions = set(ALLOWED_POSITIONS)
+    # Campos de jugadores en una sola pasada
     for p in players:
-        if p['team_id'] and p['team_id'] not in team_ids:
-            ok = False
-            if verbose: print(f"Jugador {p['first_name']} {p['last_name']} con team_id inexistente: {p['team_id']}")
-        if p['position'] and p['position'] not in ALLOWED_POSITIONS:
-            ok = False
-            if verbose: print(f"Jugador {p['first_name']} {p['last_name']} posición inválida: {p['position']}")
-        if p['rating'] and not (40 <= int(p['rating']) <= 99):
-            ok = False
-            if verbose: print(f"Jugador {p['first_name']} {p['last_name']} rating fuera de rango: {p['rating']}")
-        if p['birth_date'] and not valid_date(p['birth_date']):
-            ok = False
-            if verbose: print(f"Jugador {p['first_name']} {p['last_name']} fecha inválida: {p['birth_date']}")
+        team_id, position, rating, birth = p['team_id'], p['position'], p['rating'], p['birth_date']
+        if team_id in bad_team_ids:
+            yield f"Jugador {p['first_name']} {p['last_name']} con team_id inexistente: {team_id}"
+        if position and position not in positions:
+            yield f"Jugador {p['first_name']} {p['last_name']} posición inválida: {position}"
+        if rating and not (40 <= int(rating) <= 99):
+            yield f"Jugador {p['first_name']} {p['last_name']} rating fuera de rango: {rating}"
+        if birth and not valid_date(birth):
+            yield f"Jugador {p['first_name']} {p['last_name']} fecha inválida: {birth}"
+
+def validate(leagues, teams, players, verbose=True):
+    # Los problemas se imprimen al encontrarse; sin verbose alcanza con el primero
+    ok = True
+    for msg in iter_problems(leagues, teams, players):
+        ok = False
+        if not verbose: break
+        print(msg)
     if verbose:
         print("Validación OK" if ok else "Validación con problemas")
     return ok
 
-def export_json(leagues, teams, players):
-    with LEAGUES_JSON.open('w', encoding='utf-8') as f:
-        json.dump(leagues, f, ensure_ascii=False, indent=2)
-    with TEAMS_JSON.open('w', encoding='utf-8') as f:
-        json.dump(teams, f, ensure_ascii=False, indent=2)
-    with PLAYERS_JSON.open('w', encoding='utf-8') as f:
-        json.dump(players, f, ensure_ascii=False, indent=2)
+def write_json(path, rows, compact=False):
+    rows = [{k: v for k, v in r.items() if not k.startswith('_')} for r in rows]
+    # orjson (opcional) serializa en C; la salida indentada es idéntica a la de json.dump
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(rows, option=0 if compact else orjson.OPT_INDENT_2))
+        return
+    with path.open('w', encoding='utf-8') as f:
+        if compact:
+            json.dump(rows, f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+def export_json(leagues, teams, players, compact=False):
+    write_json(LEAGUES_JSON, leagues, compact)
+    write_json(TEAMS_JSON, teams, compact)
+    write_json(PLAYERS_JSON, players, compact)
     print("Exportado JSON a data/*.json")
 
-def read_player_template():
-    ensure_dirs()
-    tpl_path = TEMPLATES_DIR / 'player.html'
-    if tpl_path.exists():
-        return tpl_path.read_text(encoding='utf-8')
-    # Plantilla mínima por defecto si no existe el archivo
-    return """<!doctype html>
+# Plantilla mínima por defecto si no existe templates/player.html
+DEFAULT_PLAYER_TEMPLATE = """<!doctype html>
 <html lang="es">
 <head>
   <meta charset="utf-8">
@@ -260,75 +545,155 @@ def read_player_template():
 </body>
 </html>"""
 
-def build_player_pages(leagues, teams, players):
+@functools.lru_cache(maxsize=1)
+def load_template_file(path, mtime_ns):
+    # mtime_ns forma parte de la clave: editar la plantilla invalida la caché sola
+    return path.read_text(encoding='utf-8')
+
+def read_player_template():
+    ensure_dirs()
+    tpl_path = TEMPLATES_DIR / 'player.html'
+    if tpl_path.exists():
+        return load_template_file(tpl_path, tpl_path.stat().st_mtime_ns)
+    return DEFAULT_PLAYER_TEMPLATE
+
+@functools.lru_cache(maxsize=4)
+def compile_template(template):
+    """Parsea la plantilla una sola vez y devuelve render(fields) -> str,
+    equivalente a template.format(**fields) para campos simples {nombre}."""
+    parts = list(string.Formatter().parse(template))
+    if any(spec or conv or (field is not None and not field.isidentifier()) for _, field, spec, conv in parts):
+        return lambda fields: template.format(**fields)
+    literals = [literal for literal, _, _, _ in parts]
+    fields_at = [(i, field) for i, (_, field, _, _) in enumerate(parts) if field is not None]
+    def render(fields):
+        out = literals[:]
+        for i, field in fields_at:
+            out[i] += str(fields[field])
+        return ''.join(out)
+    return render
+
+def player_age_text(birth_date, now):
+    born = parse_date(birth_date)
+    if not born: return ''
+    age = now.year - born.year - ((now.month, now.day) < (born.month, born.day))
+    return f"({age} años)"
+
+def page_key(p, team_by_id, league_by_id, template_hash, now):
+    """Hash de todo lo que influye en la página de un jugador (incluida la edad de hoy)."""
+    t = team_by_id.get(p['team_id']) if p.get('team_id') else None
+    l = league_by_id.get(t['league_id']) if t and t.get('league_id') else None
+    data = [template_hash, player_age_text(p['birth_date'], now),
+            {k: v for k, v in p.items() if not k.startswith('_')},
+            t and (t['name'], t['slug']), l and (l['name'], l['slug'])]
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def read_build_cache():
+    try:
+        return json.loads(BUILD_CACHE_JSON.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+# Contexto de render del proceso actual; en build paralelo cada worker lo arma vía initializer
+_BUILD_CTX = {}
+PARALLEL_BUILD_MIN = 2000  # por debajo de esto, lanzar procesos cuesta más que renderizar
+
+def init_build_worker(template, league_by_id, team_by_id):
+    _BUILD_CTX.update(render=compile_template(template), league_by_id=league_by_id,
+                      team_by_id=team_by_id, now=datetime.utcnow())
+
+def render_player(p):
+    """Devuelve (slug, html) de un jugador con el contexto de init_build_worker()."""
+    render, now = _BUILD_CTX['render'], _BUILD_CTX['now']
+    league_by_id, team_by_id = _BUILD_CTX['league_by_id'], _BUILD_CTX['team_by_id']
+
+    full_name = f"{p['first_name']} {p['last_name']}".strip()
+    age_text = player_age_text(p['birth_date'], now)
+
+    t = team_by_id.get(p['team_id']) if p.get('team_id') else None
+    l = league_by_id.get(t['league_id']) if t and t.get('league_id') else None
+
+    team_link = f"<a class='clean' href='../equipo.html?slug={t['slug']}'>{t['name']}</a>" if t else "Sin equipo"
+    league_link = f"<a class='clean' href='../liga.html?slug={l['slug']}'>{l['name']}</a>" if l else "—"
+
+    flag_src = f"img/flags/{country_to_file(p['country'])}.png"
+    flag_img = f"<img class='flag' src='../{flag_src}' alt='{p['country']}' onerror=\"this.style.display='none'\">" if p.get('country') else ''
+
+    sofifa_link = f"<a class='clean' href='{p['sofifa_url']}' target='_blank' rel='noopener'>Ver en SoFIFA</a>" if p.get('sofifa_url') else ""
+    face_video_link = f"<a class='clean' href='{p['face_video_url']}' target='_blank' rel='noopener' style='margin-left:12px'>Video de cara</a>" if p.get('face_video_url') else ""
+
+    html = render(dict(
+        title=f"{full_name} — LAQP",
+        full_name=full_name or "Jugador",
+        rating=p.get('rating', '') or '',
+        photo=p.get('photo') or 'img/jugadores/placeholder.png',
+        position=p.get('position') or '-',
+        birth_date=p.get('birth_date') or '',
+        age_text=age_text,
+        team_link=team_link,
+        league_link=league_link,
+        country=p.get('country') or '',
+        flag_img=flag_img,
+        sofifa_link=sofifa_link,
+        face_video_link=face_video_link,
+    ))
+    return p['slug'], html
+
+def write_page(item):
+    out_path, data = item
+    out_path.write_bytes(data)
+
+def build_player_pages(leagues, teams, players, force=False):
     ensure_dirs()
-    template = read_player_template()
+    ctx = (read_player_template(), {l['id']: l for l in leagues}, {t['id']: t for t in teams})
 
-    league_by_id = {l['id']: l for l in leagues}
-    team_by_id = {t['id']: t for t in teams}
+    # Solo se renderizan los jugadores cuya entrada cambió desde el último build
+    template_hash = hashlib.blake2b(ctx[0].encode('utf-8'), digest_size=16).hexdigest()
+    now = datetime.utcnow()
+    old_cache = {} if force else read_build_cache()
+    cache = {p['slug']: page_key(p, ctx[2], ctx[1], template_hash, now) for p in players}
+    total = len(players)
+    players = [p for p in players
+               if old_cache.get(p['slug']) != cache[p['slug']] or not (PLAYERS_DIR / f"{p['slug']}.html").exists()]
 
-    count = 0
-    for p in players:
-        full_name = f"{p['first_name']} {p['last_name']}".strip()
-        # edad
-        age_text = ''
-        try:
-            d = datetime.strptime(p['birth_date'], '%Y-%m-%d')
-            now = datetime.utcnow()
-            age = now.year - d.year - ((now.month, now.day) < (d.month, d.day))
-            age_text = f"({age} años)"
-        except Exception:
-            age_text = ''
-
-        t = team_by_id.get(p['team_id']) if p.get('team_id') else None
-        l = league_by_id.get(t['league_id']) if t and t.get('league_id') else None
-
-        team_link = f"<a class='clean' href='../equipo.html?slug={t['slug']}'>{t['name']}</a>" if t else "Sin equipo"
-        league_link = f"<a class='clean' href='../liga.html?slug={l['slug']}'>{l['name']}</a>" if l else "—"
-
-        flag_src = f"img/flags/{country_to_file(p['country'])}.png"
-        flag_img = f"<img class='flag' src='../{flag_src}' alt='{p['country']}' onerror=\"this.style.display='none'\">" if p.get('country') else ''
-
-        sofifa_link = f"<a class='clean' href='{p['sofifa_url']}' target='_blank' rel='noopener'>Ver en SoFIFA</a>" if p.get('sofifa_url') else ""
-        face_video_link = f"<a class='clean' href='{p['face_video_url']}' target='_blank' rel='noopener' style='margin-left:12px'>Video de cara</a>" if p.get('face_video_url') else ""
-
-        html = template.format(
-            title=f"{full_name} — LAQP",
-            full_name=full_name or "Jugador",
-            rating=p.get('rating', '') or '',
-            photo=p.get('photo') or 'img/jugadores/placeholder.png',
-            position=p.get('position') or '-',
-            birth_date=p.get('birth_date') or '',
-            age_text=age_text,
-            team_link=team_link,
-            league_link=league_link,
-            country=p.get('country') or '',
-            flag_img=flag_img,
-            sofifa_link=sofifa_link,
-            face_video_link=face_video_link,
-        )
-
-        out_path = PLAYERS_DIR / f"{p['slug']}.html"
-        out_path.write_text(html, encoding='utf-8')
+    # Cada página es independiente: con muchos jugadores se reparte el render entre núcleos
+    if len(players) >= PARALLEL_BUILD_MIN and (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(initializer=init_build_worker, initargs=ctx) as ex:
+            pages = list(ex.map(render_player, players, chunksize=64))
+    else:
+        init_build_worker(*ctx)
+        pages = map(render_player, players)
+
+    # Se codifica una sola vez y las escrituras (bloqueantes) se solapan en hilos;
+    # el salto de línea es el de la plataforma, como hacía write_text.
+    # Un dict por ruta: con slugs repetidos (o vacíos) gana la última página, como en
+    # una escritura secuencial, y dos hilos nunca escriben el mismo archivo a la vez
+    outputs, count = {}, 0
+    for slug, html in pages:
+        outputs[PLAYERS_DIR / f"{slug}.html"] = html.replace('\n', os.linesep).encode('utf-8')
         count += 1
+    with ThreadPoolExecutor(max_workers=32) as ex:
+        list(ex.map(write_page, outputs.items()))
 
-    print(f"Generadas {count} páginas en {PLAYERS_DIR}/")
+    BUILD_CACHE_JSON.write_text(json.dumps(cache, sort_keys=True), encoding='utf-8')
+    print(f"Generadas {count} páginas en {PLAYERS_DIR}/ ({total - count} sin cambios)")
 
-def export_cmd():
+def export_cmd(compact=False):
     leagues, teams, players = load_all()
     if not validate(leagues, teams, players, verbose=True):
         ans = input("Validación con problemas. Exportar igual? (s/N): ").strip().lower()
         if ans != 's':
             return
-    export_json(leagues, teams, players)
+    export_json(leagues, teams, players, compact=compact)
 
-def build_cmd():
+def build_cmd(force=False):
     leagues, teams, players = load_all()
     if not validate(leagues, teams, players, verbose=True):
         ans = input("Validación con problemas. Continuar build? (s/N): ").strip().lower()
         if ans != 's':
             return
-    build_player_pages(leagues, teams, players)
+    build_player_pages(leagues, teams, players, force=force)
 
 def prompt(msg, default=None, required=False, validator=None):
     while True:
@@ -346,13 +711,41 @@ def prompt(msg, default=None, required=False, validator=None):
                 print(err); continue
         return val
 
+def write_lines(lines):
+    """Imprime las líneas con una sola escritura a stdout. Si la salida se cortó
+    (p. ej. `| head`), se descarta el resto sin error."""
+    if not lines: return
+    try:
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Redirige a devnull para que el flush final al salir no vuelva a fallar
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
 def pick_from(rows, label_key='name'):
-    for r in rows:
-        print(f"{r['id']}: {r[label_key]}")
+    write_lines([f"{r['id']}: {r[label_key]}" for r in rows])
     return input("Ingresa id (o vacío para cancelar): ").strip()
 
 def ensure_slug_entity(name, existing_slugs):
-    return unique_slug(name, set(s for s in existing_slugs if s))
+    """existing_slugs: set ya armado por el llamador (sin slugs vacíos). El slug nuevo
+    se agrega al set, así en altas sucesivas se reutiliza el mismo set sin reconstruirlo."""
+    slug = unique_slug(name, existing_slugs)
+    existing_slugs.add(slug)
+    return slug
+
+# Validadores compartidos por los prompts y la importación: devuelven (ok, mensaje)
+def check_date(v):
+    return (valid_date(v), "Fecha inválida (YYYY-MM-DD)")
+
+def check_position(v):
+    return (v in ALLOWED_POSITIONS, f"Posición inválida. Usa: {', '.join(ALLOWED_POSITIONS)}")
+
+def check_rating(v):
+    try:
+        n = int(v)
+    except (TypeError, ValueError):
+        return (False, "Rating numérico 40..99")
+    return (40 <= n <= 99, "Rating debe estar entre 40 y 99")
 
 def interactive_menu():
     print("=== Gestor LAQP — Menú ===")
@@ -393,235 +786,443 @@ def interactive_menu():
 def menu_list_leagues():
     leagues, _, _ = load_all()
     q = input("Buscar (nombre/país, vacío para listar todo): ").strip().lower()
-    rows = [l for l in leagues if q in (l['name']+' '+l['country']).lower()] if q else leagues
+    rows = search_rows('leagues', leagues, q)
     rows = sorted(rows, key=lambda l: l['name'])
-    for l in rows:
-        print(f"{l['id']}: {l['name']} — {l['country']} (slug: {l['slug']})")
+    write_lines([f"{l['id']}: {l['name']} — {l['country']} (slug: {l['slug']})" for l in rows])
 
 def menu_add_league():
-    leagues, _, _ = load_all()
+    leagues, _, _ = load_all(copy='leagues')
     name = prompt("Nombre de liga", required=True)
     country = prompt("País", required=True)
     logo = prompt("Ruta logo (img/ligas/...)", default="img/ligas/placeholder.png")
-    slug = ensure_slug_entity(name, [l['slug'] for l in leagues])
-    l = {'id': next_id(leagues), 'name': name, 'country': country, 'logo': logo, 'slug': slug}
+    slug = ensure_slug_entity(name, {l['slug'] for l in leagues if l['slug']})
+    l = {'id': next_id(leagues, 'leagues'), 'name': name, 'country': country, 'logo': logo, 'slug': slug}
     backup_all()
     leagues.append(l)
-    save_all(leagues, *load_all()[1:])
+    save_table('leagues', leagues, added=[l])
     print("Liga añadida:", l['id'], l['name'])
 
 def menu_edit_league():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='leagues')
     lid = pick_from(sorted(leagues, key=lambda l:l['name']))
     if not lid: return
-    l = next((x for x in leagues if x['id']==lid), None)
+    l = find_row('leagues', leagues, lid)
     if not l: print("No encontrada"); return
     name = prompt("Nombre", default=l['name'], required=True)
     country = prompt("País", default=l['country'], required=True)
     logo = prompt("Logo", default=l['logo'] or "img/ligas/placeholder.png")
     if name != l['name']:
-        l['slug'] = ensure_slug_entity(name, [x['slug'] for x in leagues if x['id']!=l['id']])
+        l['slug'] = ensure_slug_entity(name, {x['slug'] for x in leagues if x['slug'] and x['id']!=l['id']})
     l['name']=name; l['country']=country; l['logo']=logo
     backup_all()
-    save_all(leagues, teams, players)
+    save_table('leagues', leagues)
     print("Liga actualizada.")
 
 def menu_delete_league():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy=('leagues', 'teams'))
     lid = pick_from(sorted(leagues, key=lambda l:l['name']))
     if not lid: return
-    l = next((x for x in leagues if x['id']==lid), None)
+    l = find_row('leagues', leagues, lid)
     if not l: print("No encontrada"); return
-    print(f"Eliminará la liga '{l['name']}' y desasignará {sum(1 for t in teams if t['league_id']==lid)} equipos.")
+    print(f"Eliminará la liga '{l['name']}' y desasignará {len(get_index()['children']['league_teams'].get(lid, ()))} equipos.")
     if input("Confirmar? (s/N): ").strip().lower()!='s': return
     backup_all()
     leagues = [x for x in leagues if x['id']!=lid]
     for t in teams:
         if t['league_id']==lid:
             t['league_id']=''
-    save_all(leagues, teams, players)
+    save_table('leagues', leagues)
+    save_table('teams', teams)
     print("Liga eliminada y equipos desasignados.")
 
 # --- Equipos ---
 def menu_list_teams():
     leagues, teams, _ = load_all()
-    lid_name = {l['id']:l['name'] for l in leagues}
+    league_by_id = get_index()['by_id']['leagues']
     q = input("Buscar (nombre, vacío para todo): ").strip().lower()
-    rows = [t for t in teams if q in t['name'].lower()] if q else teams
-    for t in sorted(rows, key=lambda t:t['name']):
-        print(f"{t['id']}: {t['name']} — {lid_name.get(t['league_id'],'Sin liga')} (slug: {t['slug']})")
+    rows = search_rows('teams', teams, q)
+    write_lines([f"{t['id']}: {t['name']} — {league_by_id[t['league_id']]['name'] if t['league_id'] in league_by_id else 'Sin liga'} (slug: {t['slug']})"
+                 for t in sorted(rows, key=lambda t:t['name'])])
 
 def menu_add_team():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='teams')
     name = prompt("Nombre de equipo", required=True)
     print("Liga (opcional):")
     lid = pick_from(sorted(leagues, key=lambda l:l['name'])) or ''
     logo = prompt("Ruta logo (img/equipos/...)", default="img/equipos/placeholder.png")
-    slug = ensure_slug_entity(name, [t['slug'] for t in teams])
-    t = {'id': next_id(teams), 'name': name, 'league_id': lid, 'logo': logo, 'slug': slug}
+    slug = ensure_slug_entity(name, {t['slug'] for t in teams if t['slug']})
+    t = {'id': next_id(teams, 'teams'), 'name': name, 'league_id': lid, 'logo': logo, 'slug': slug}
     backup_all()
     teams.append(t)
-    save_all(leagues, teams, players)
+    save_table('teams', teams, added=[t])
     print("Equipo añadido:", t['id'], t['name'])
 
 def menu_edit_team():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='teams')
     tid = pick_from(sorted(teams, key=lambda t:t['name']))
     if not tid: return
-    t = next((x for x in teams if x['id']==tid), None)
+    t = find_row('teams', teams, tid)
     if not t: print("No encontrado"); return
     name = prompt("Nombre", default=t['name'], required=True)
     print("Seleccionar liga (opcional):")
     lid = pick_from(sorted(leagues, key=lambda l:l['name'])) or ''
     logo = prompt("Logo", default=t['logo'] or "img/equipos/placeholder.png")
     if name != t['name']:
-        t['slug'] = ensure_slug_entity(name, [x['slug'] for x in teams if x['id']!=t['id']])
+        t['slug'] = ensure_slug_entity(name, {x['slug'] for x in teams if x['slug'] and x['id']!=t['id']})
     t['name']=name; t['league_id']=lid; t['logo']=logo
     backup_all()
-    save_all(leagues, teams, players)
+    save_table('teams', teams)
     print("Equipo actualizado.")
 
 def menu_delete_team():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='teams')
     tid = pick_from(sorted(teams, key=lambda t:t['name']))
     if not tid: return
-    t = next((x for x in teams if x['id']==tid), None)
+    t = find_row('teams', teams, tid)
     if not t: print("No encontrado"); return
-    cnt = sum(1 for p in players if p['team_id']==tid)
+    cnt = len(get_index()['children']['team_players'].get(tid, ()))
     if cnt>0:
         print(f"Bloqueado: el equipo tiene {cnt} jugadores. Reasigna o elimina jugadores antes.")
         return
     if input(f"Confirmar eliminación de '{t['name']}'? (s/N): ").strip().lower()!='s': return
     backup_all()
     teams = [x for x in teams if x['id']!=tid]
-    save_all(leagues, teams, players)
+    save_table('teams', teams)
     print("Equipo eliminado.")
 
 # --- Jugadores ---
 def menu_list_players():
     leagues, teams, players = load_all()
-    team_name = {t['id']:t['name'] for t in teams}
+    team_by_id = get_index()['by_id']['teams']
     q = input("Buscar (nombre/apellido, vacío para todo): ").strip().lower()
-    rows = [p for p in players if q in (p['first_name']+' '+p['last_name']).lower()] if q else players
-    rows = sorted(rows, key=lambda p:(-int(p['rating'] or 0), p['last_name'], p['first_name']))
-    for p in rows[:200]:
-        print(f"{p['id']}: {p['first_name']} {p['last_name']} — {team_name.get(p['team_id'],'Sin equipo')} — {p['position']} — {p['rating']} (slug: {p['slug']})")
-    if len(rows)>200: print(f"... {len(rows)-200} más")
+    rows = search_rows('players', players, q)
+    # Solo se muestran 200: top-k con heapq en vez de ordenar todo el plantel
+    top = heapq.nsmallest(200, rows, key=lambda p:(-int(p['rating'] or 0), p['last_name'], p['first_name']))
+    lines = [f"{p['id']}: {p['first_name']} {p['last_name']} — {team_by_id[p['team_id']]['name'] if p['team_id'] in team_by_id else 'Sin equipo'} — {p['position']} — {p['rating']} (slug: {p['slug']})"
+             for p in top]
+    if len(rows)>200: lines.append(f"... {len(rows)-200} más")
+    write_lines(lines)
 
 def menu_add_player():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='players')
     first = prompt("Nombre", required=True)
     last = prompt("Apellido", required=True)
-    birth = prompt("Fecha nacimiento (YYYY-MM-DD)", required=True, validator=lambda v: (valid_date(v),"Fecha inválida (YYYY-MM-DD)"))
+    birth = prompt("Fecha nacimiento (YYYY-MM-DD)", required=True, validator=check_date)
     print("Elegir equipo (opcional):")
     tid = pick_from(sorted(teams, key=lambda t:t['name'])) or ''
     country = prompt("País (para bandera img/flags/nombre_del_pais.png)", required=True)
     photo = prompt("Foto (img/jugadores/...)", default="img/jugadores/placeholder.png")
-    def val_pos(v): return (v in ALLOWED_POSITIONS, f"Posición inválida. Usa: {', '.join(ALLOWED_POSITIONS)}")
-    position = prompt(f"Posición {ALLOWED_POSITIONS}", required=True, validator=val_pos)
-    def val_rating(v):
-        try:
-            n=int(v); return (40<=n<=99, "Rating debe estar entre 40 y 99")
-        except: return (False, "Rating numérico 40..99")
-    rating = int(prompt("Rating (40-99)", required=True, validator=val_rating))
+    position = prompt(f"Posición {ALLOWED_POSITIONS}", required=True, validator=check_position)
+    rating = int(prompt("Rating (40-99)", required=True, validator=check_rating))
     sofifa = prompt("URL SoFIFA (opcional)", default="")
     face_video = prompt("URL Video de cara (opcional)", default="")
-    slug = ensure_slug_entity(f"{first} {last}", [x['slug'] for x in players])
-    p = {'id': next_id(players),'first_name':first,'last_name':last,'birth_date':birth,'team_id':tid,'country':country,'photo':photo,'position':position,'rating':rating,'sofifa_url':sofifa,'face_video_url':face_video,'slug':slug}
+    slug = ensure_slug_entity(f"{first} {last}", {x['slug'] for x in players if x['slug']})
+    p = {'id': next_id(players, 'players'),'first_name':first,'last_name':last,'birth_date':birth,'team_id':tid,'country':country,'photo':photo,'position':position,'rating':rating,'sofifa_url':sofifa,'face_video_url':face_video,'slug':slug}
     backup_all()
     players.append(p)
-    save_all(leagues, teams, players)
+    save_table('players', players, added=[p])
     print("Jugador añadido:", p['id'], first, last)
 
 def menu_edit_player():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='players')
     q = input("Buscar jugador (texto, vacío para listar): ").strip().lower()
-    rows = [p for p in players if q in (p['first_name']+' '+p['last_name']).lower()] if q else players
+    rows = search_rows('players', players, q)
     rows = sorted(rows, key=lambda p:(p['last_name'], p['first_name']))
-    for p in rows[:100]:
-        print(f"{p['id']}: {p['first_name']} {p['last_name']}")
+    write_lines([f"{p['id']}: {p['first_name']} {p['last_name']}" for p in rows[:100]])
     pid = input("Id a editar: ").strip()
     if not pid: return
-    p = next((x for x in players if x['id']==pid), None)
+    p = find_row('players', players, pid)
     if not p: print("No encontrado"); return
 
     first = prompt("Nombre", default=p['first_name'], required=True)
     last = prompt("Apellido", default=p['last_name'], required=True)
-    birth = prompt("Fecha (YYYY-MM-DD)", default=p['birth_date'] or '', required=True, validator=lambda v: (valid_date(v),"Fecha inválida"))
+    birth = prompt("Fecha (YYYY-MM-DD)", default=p['birth_date'] or '', required=True, validator=check_date)
     print("Elegir equipo (opcional):")
     tid = pick_from(sorted(teams, key=lambda t:t['name'])) or ''
     country = prompt("País", default=p['country'] or '', required=True)
     photo = prompt("Foto", default=p['photo'] or "img/jugadores/placeholder.png")
-    def val_pos(v): return (v in ALLOWED_POSITIONS, f"Posición inválida. Usa: {', '.join(ALLOWED_POSITIONS)}")
-    position = prompt("Posición", default=p['position'] or '', required=True, validator=val_pos)
-    def val_rating(v):
-        try:
-            n=int(v); return (40<=n<=99, "Rating 40..99")
-        except: return (False, "Rating numérico 40..99")
-    rating = int(prompt("Rating (40-99)", default=str(p['rating'] or 40), required=True, validator=val_rating))
+    position = prompt("Posición", default=p['position'] or '', required=True, validator=check_position)
+    rating = int(prompt("Rating (40-99)", default=str(p['rating'] or 40), required=True, validator=check_rating))
     sofifa = prompt("URL SoFIFA", default=p.get('sofifa_url',''))
     face_video = prompt("URL Video de cara", default=p.get('face_video_url',''))
 
     if first!=p['first_name'] or last!=p['last_name']:
-        p['slug'] = ensure_slug_entity(f"{first} {last}", [x['slug'] for x in players if x['id']!=p['id']])
+        p['slug'] = ensure_slug_entity(f"{first} {last}", {x['slug'] for x in players if x['slug'] and x['id']!=p['id']})
     p.update({'first_name':first,'last_name':last,'birth_date':birth,'team_id':tid,'country':country,'photo':photo,'position':position,'rating':rating,'sofifa_url':sofifa,'face_video_url':face_video})
     backup_all()
-    save_all(leagues, teams, players)
+    save_table('players', players)
     print("Jugador actualizado.")
 
 def menu_delete_player():
-    leagues, teams, players = load_all()
+    leagues, teams, players = load_all(copy='players')
     q = input("Buscar (texto, vacío para listar): ").strip().lower()
-    rows = [p for p in players if q in (p['first_name']+' '+p['last_name']).lower()] if q else players
-    for p in rows[:100]:
-        print(f"{p['id']}: {p['first_name']} {p['last_name']}")
+    rows = search_rows('players', players, q)
+    write_lines([f"{p['id']}: {p['first_name']} {p['last_name']}" for p in rows[:100]])
     pid = input("Id a eliminar: ").strip()
     if not pid: return
-    p = next((x for x in players if x['id']==pid), None)
+    p = find_row('players', players, pid)
     if not p: print("No encontrado"); return
     if input(f"Confirmar eliminación de {p['first_name']} {p['last_name']}? (s/N): ").strip().lower()!='s': return
     backup_all()
     players = [x for x in players if x['id']!=pid]
-    save_all(leagues, teams, players)
+    save_table('players', players)
     print("Jugador eliminado.")
 
+# --- Importación por lotes (sin prompts) ---
+def add_leagues_batch(leagues, rows, seed=None, slugs=None):
+    """Agrega a leagues las filas (name, country, logo). Devuelve (agregadas, errores), con
+    errores como pares (línea, mensaje). seed: primer id a usar; por defecto el siguiente
+    al máximo de la caché. slugs: set de slugs existentes si el llamador ya lo tiene (se
+    actualiza con los nuevos); lo mismo league_ids/team_ids en los otros add_*_batch."""
+    slugs = {l['slug'] for l in leagues if l['slug']} if slugs is None else slugs
+    seed = int(next_id(leagues, 'leagues')) if seed is None else seed
+    added, errors = [], []
+    for i, r in enumerate(rows, 2):  # la fila 1 es el encabezado
+        n = r.get('_line', i)  # línea real en el archivo, si viene de read_import_csv()
+        name, country = (r.get('name') or '').strip(), (r.get('country') or '').strip()
+        if not name or not country:
+            errors.append((n, "name y country son requeridos")); continue
+        slug = ensure_slug_entity(name, slugs)
+        added.append({'id': str(seed+len(added)), 'name': name, 'country': country,
+                      'logo': (r.get('logo') or '').strip() or 'img/ligas/placeholder.png', 'slug': slug})
+    leagues.extend(added)
+    return added, errors
+
+def add_teams_batch(leagues, teams, rows, seed=None, slugs=None, league_ids=None):
+    """Agrega a teams las filas (name, league_id, logo). Devuelve (agregados, errores (línea, mensaje))."""
+    league_ids = {l['id'] for l in leagues} if league_ids is None else league_ids
+    slugs = {t['slug'] for t in teams if t['slug']} if slugs is None else slugs
+    seed = int(next_id(teams, 'teams')) if seed is None else seed
+    added, errors = [], []
+    for i, r in enumerate(rows, 2):
+        n = r.get('_line', i)
+        name, lid = (r.get('name') or '').strip(), (r.get('league_id') or '').strip()
+        if not name:
+            errors.append((n, "name es requerido")); continue
+        if lid and lid not in league_ids:
+            errors.append((n, f"league_id inexistente: {lid}")); continue
+        slug = ensure_slug_entity(name, slugs)
+        added.append({'id': str(seed+len(added)), 'name': name, 'league_id': lid,
+                      'logo': (r.get('logo') or '').strip() or 'img/equipos/placeholder.png', 'slug': slug})
+    teams.extend(added)
+    return added, errors
+
+def add_players_batch(teams, players, rows, seed=None, slugs=None, team_ids=None):
+    """Agrega a players las filas (mismas columnas que jugadores.csv, sin id ni slug).
+    Devuelve (agregados, errores (línea, mensaje))."""
+    team_ids = {t['id'] for t in teams} if team_ids is None else team_ids
+    slugs = {p['slug'] for p in players if p['slug']} if slugs is None else slugs
+    seed = int(next_id(players, 'players')) if seed is None else seed
+    added, errors = [], []
+    for i, r in enumerate(rows, 2):
+        n = r.get('_line', i)
+        p = {k: (r.get(k) or '').strip() for k in PLAYER_HEADERS}
+        problems = [f"{k} es requerido" for k in ('first_name', 'last_name', 'country') if not p[k]]
+        if p['team_id'] and p['team_id'] not in team_ids:
+            problems.append(f"team_id inexistente: {p['team_id']}")
+        for field, check in (('birth_date', check_date), ('position', check_position), ('rating', check_rating)):
+            ok, err = check(p[field])
+            if not ok: problems.append(f"{err} ({field}={p[field]!r})")
+        if problems:
+            errors.append((n, '; '.join(problems))); continue
+        p['id'] = str(seed+len(added))
+        p['rating'] = int(p['rating'])
+        p['photo'] = p['photo'] or 'img/jugadores/placeholder.png'
+        p['slug'] = ensure_slug_entity(f"{p['first_name']} {p['last_name']}", slugs)
+        added.append(p)
+    players.extend(added)
+    return added, errors
+
+def read_import_csv(path):
+    """Filas de un CSV a importar, cada una con '_line' (su línea en el archivo) para los
+    mensajes de error. utf-8-sig: tolera el BOM que agrega Excel al guardar "CSV UTF-8"."""
+    with path.open(newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        return [dict(r, _line=reader.line_num) for r in reader]
+
+def import_cmd(entity, path):
+    """Importa un CSV completo de una entidad: todo o nada, con un solo backup y un solo guardado.
+    Devuelve False si no se importó por un error (main() sale con código 1)."""
+    path = Path(path)
+    if not path.exists():
+        print(f"No existe {path}"); return False
+    leagues, teams, players = load_all(copy=entity)
+    rows = read_import_csv(path)
+    if entity == 'leagues':
+        added, errors = add_leagues_batch(leagues, rows)
+    elif entity == 'teams':
+        added, errors = add_teams_batch(leagues, teams, rows)
+    else:
+        added, errors = add_players_batch(teams, players, rows)
+    if errors:
+        for n, msg in errors: print(f"Fila {n}: {msg}")
+        print("Importación cancelada: no se guardó nada.")
+        return False
+    if not added:
+        print("Nada para importar."); return True
+    backup_all()
+    save_table(entity, {'leagues': leagues, 'teams': teams, 'players': players}[entity], added=added)
+    print(f"Importados {len(added)} registros en {entity}.")
+    return True
+
+# Campos editables por entidad en las operaciones de lote (id y slug los maneja el script)
+BATCH_FIELDS = {'leagues': LEAGUE_HEADERS[1:-1], 'teams': TEAM_HEADERS[1:-1], 'players': PLAYER_HEADERS[1:-1]}
+
+def apply_ops(leagues, teams, players, ops):
+    """Aplica en memoria operaciones {"entity", "op": add|update|delete, "id", "fields"}.
+    Devuelve (entidades a reescribir, filas agregadas por entidad, errores)."""
+    data = {'leagues': leagues, 'teams': teams, 'players': players}
+    # Próximo id por entidad: se toma una vez del índice y avanza con cada alta
+    seeds = {key: int(next_id(rows, key)) for key, rows in data.items()}
+    # Slugs, ids y jugadores por equipo: se arman una vez y se actualizan con cada operación
+    slugs = {key: {r['slug'] for r in rows if r['slug']} for key, rows in data.items()}
+    ids = {key: {r['id'] for r in rows} for key, rows in data.items()}
+    team_players = {}
+    for p in players:
+        team_players[p['team_id']] = team_players.get(p['team_id'], 0) + 1
+    rewrite, added, errors = set(), {}, []
+    for n, o in enumerate(ops, 1):
+        entity, op, fields = (o.get('entity'), o.get('op'), o.get('fields') or {}) if isinstance(o, dict) else (None, None, None)
+        if entity not in data or op not in ('add', 'update', 'delete') or not isinstance(fields, dict):
+            errors.append(f"Operación {n}: entity/op/fields inválidos"); continue
+        fields = {k: '' if v is None else str(v).strip() for k, v in fields.items()}
+        rows = data[entity]
+        if op == 'add':
+            if entity == 'leagues':
+                new, errs = add_leagues_batch(leagues, [fields], seeds[entity], slugs[entity])
+            elif entity == 'teams':
+                new, errs = add_teams_batch(leagues, teams, [fields], seeds[entity], slugs[entity], ids['leagues'])
+            else:
+                new, errs = add_players_batch(teams, players, [fields], seeds[entity], slugs[entity], ids['teams'])
+                for p in new:
+                    team_players[p['team_id']] = team_players.get(p['team_id'], 0) + 1
+            seeds[entity] += len(new)
+            ids[entity].update(r['id'] for r in new)
+            errors.extend(f"Operación {n}: {msg}" for _, msg in errs)
+            added.setdefault(entity, []).extend(new)
+            continue
+        rid = str(o.get('id', ''))
+        row = find_row(entity, rows, rid) if rid in ids[entity] else None
+        if row is None:
+            errors.append(f"Operación {n}: id inexistente en {entity}: {rid}"); continue
+        if op == 'delete':
+            # Mismas reglas que el menú: la liga desasigna equipos, el equipo con jugadores no se borra
+            if entity == 'teams' and team_players.get(rid):
+                errors.append(f"Operación {n}: el equipo {rid} tiene jugadores"); continue
+            rows[:] = [x for x in rows if x['id'] != rid]
+            ids[entity].discard(rid)
+            slugs[entity].discard(row['slug'])
+            if entity == 'players':
+                team_players[row['team_id']] -= 1
+            if entity == 'leagues':
+                for t in teams:
+                    if t['league_id'] == rid:
+                        t['league_id'] = ''; rewrite.add('teams')
+            rewrite.add(entity)
+            continue
+        problems = [f"campo desconocido: {k}" for k in fields if k not in BATCH_FIELDS[entity]]
+        problems += [f"{k} es requerido" for k in ('name', 'country', 'first_name', 'last_name') if k in fields and not fields[k]]
+        if fields.get('league_id') and fields['league_id'] not in ids['leagues']:
+            problems.append(f"league_id inexistente: {fields['league_id']}")
+        if fields.get('team_id') and fields['team_id'] not in ids['teams']:
+            problems.append(f"team_id inexistente: {fields['team_id']}")
+        for field, check in (('birth_date', check_date), ('position', check_position), ('rating', check_rating)):
+            if field in fields:
+                ok, err = check(fields[field])
+                if not ok: problems.append(f"{err} ({field}={fields[field]!r})")
+        if problems:
+            errors.append(f"Operación {n}: " + '; '.join(problems)); continue
+        if 'rating' in fields: fields['rating'] = int(fields['rating'])
+        name_keys = ('first_name', 'last_name') if entity == 'players' else ('name',)
+        renamed = any(k in fields and fields[k] != row[k] for k in name_keys)
+        if entity == 'players' and 'team_id' in fields:
+            team_players[row['team_id']] -= 1
+            team_players[fields['team_id']] = team_players.get(fields['team_id'], 0) + 1
+        row.update(fields)
+        if renamed:
+            name = f"{row['first_name']} {row['last_name']}" if entity == 'players' else row['name']
+            slugs[entity].discard(row['slug'])
+            row['slug'] = ensure_slug_entity(name, slugs[entity])
+        rewrite.add(entity)
+    return rewrite, added, errors
+
+def batch_cmd(path):
+    """Aplica un JSON con una lista de operaciones: todo o nada, con una sola lectura,
+    un solo backup y un guardado por entidad tocada. Devuelve False si no se aplicó por
+    un error (main() sale con código 1)."""
+    path = Path(path)
+    if not path.exists():
+        print(f"No existe {path}"); return False
+    try:
+        ops = json.loads(path.read_text(encoding='utf-8'))
+    except ValueError as e:
+        print(f"JSON inválido en {path}: {e}"); return False
+    if not isinstance(ops, list):
+        print("El archivo debe contener una lista de operaciones."); return False
+    leagues, teams, players = load_all(copy=('leagues', 'teams', 'players'))
+    rewrite, added, errors = apply_ops(leagues, teams, players, ops)
+    if errors:
+        for e in errors: print(e)
+        print("Lote cancelado: no se guardó nada.")
+        return False
+    if not rewrite and not added:
+        print("Nada para aplicar."); return True
+    backup_all()
+    for entity, rows in zip(TABLES, (leagues, teams, players)):
+        if entity in rewrite: save_table(entity, rows)
+        elif entity in added: save_table(entity, rows, added=added[entity])
+    print(f"Aplicadas {len(ops)} operaciones.")
+    return True
+
 # --- Meta ---
 def menu_backup():
     made = backup_all()
-    if not made: print("Nada que copiar (CSV no existentes).")
+    if not made: print("Nada que copiar (CSV sin cambios desde el último backup o no existentes).")
     else:
         for p in made: print("Backup:", p)
 
 def build_arg_parser():
     p = argparse.ArgumentParser(description="Gestor LAQP (interactivo por defecto).")
+    p.add_argument('--no-cache', action='store_true', help="releer los CSV en cada acción")
     sub = p.add_subparsers(dest='cmd')
-    sub.add_parser('export')
+    sub.add_parser('export').add_argument('--compact', action='store_true', help="JSON sin indentar (más chico)")
     sub.add_parser('validate')
-    sub.add_parser('build')
+    sub.add_parser('build').add_argument('--force', action='store_true', help="regenerar todas las páginas")
+    imp = sub.add_parser('import', help="importar filas nuevas desde un CSV (sin prompts)")
+    imp.add_argument('--entity', required=True, choices=['leagues', 'teams', 'players'])
+    imp.add_argument('csv')
+    sub.add_parser('batch', help="aplicar add/update/delete desde un JSON (sin prompts)").add_argument(
+        '--ops', required=True, help="archivo JSON: lista de {entity, op, id, fields}")
     return p
 
 def ensure_csv_headers():
     ensure_dirs()
     if not LEAGUES_CSV.exists():
-        write_csv(LEAGUES_CSV, [], ['id','name','country','logo','slug'])
+        write_csv(LEAGUES_CSV, [], LEAGUE_HEADERS)
     if not TEAMS_CSV.exists():
-        write_csv(TEAMS_CSV, [], ['id','name','league_id','logo','slug'])
+        write_csv(TEAMS_CSV, [], TEAM_HEADERS)
     if not PLAYERS_CSV.exists():
-        write_csv(PLAYERS_CSV, [], ['id','first_name','last_name','birth_date','team_id','country','photo','position','rating','sofifa_url','face_video_url','slug'])
+        write_csv(PLAYERS_CSV, [], PLAYER_HEADERS)
 
 def main():
     ensure_csv_headers()
     parser = build_arg_parser()
     args = parser.parse_args()
+    if args.no_cache:
+        _STATE['enabled'] = False
     if not args.cmd:
         interactive_menu()
         return
     if args.cmd=='export':
-        export_cmd()
+        export_cmd(compact=args.compact)
     elif args.cmd=='validate':
         validate(*load_all())
     elif args.cmd=='build':
-        build_cmd()
+        build_cmd(force=args.force)
+    elif args.cmd=='import':
+        if not import_cmd(args.entity, args.csv): sys.exit(1)
+    elif args.cmd=='batch':
+        if not batch_cmd(args.ops): sys.exit(1)
     else:
         parser.print_help()
 